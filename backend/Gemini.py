@@ -1,81 +1,131 @@
+import asyncio
+import copy
+import functools
+import gzip
+import hashlib
 import json
+import logging
+import mmap
 import os
-from typing import Dict, Any, List, Optional
+import re
+import weakref
+from collections import OrderedDict
+from typing import IO, Dict, Any, List, Optional, Tuple
 try:
-    import google.generativeai as genai  # type: ignore
+    import orjson  # type: ignore
 except Exception:
-    genai = None
-from datetime import datetime
-from dotenv import load_dotenv
+    orjson = None
+from datetime import date, datetime
+import jinja2
+
+log = logging.getLogger("lumera.gemini")
 
 # ============================================================
 # GEMINI CONFIGURATION
 # ============================================================
-# Load .env from current working directory and also from this file's directory
-# so that starting uvicorn from parent/root still picks up the key.
-load_dotenv()  # try CWD first
-try:
-    _HERE = os.path.dirname(os.path.abspath(__file__))
-    _ENV_PATH = os.path.join(_HERE, ".env")
-    if os.path.exists(_ENV_PATH):
-        load_dotenv(dotenv_path=_ENV_PATH, override=False)
-except Exception:
-    # Non-fatal: we will still rely on existing env if present
-    pass
 GEMINI_MODEL = "gemini-2.0-flash-exp"
 GEMINI_ENABLED = False
+# google.generativeai pulls in protobuf/grpc, so it is only imported by
+# configure_gemini() once an API key is known to be present.
+genai = None
+# Set once the import has failed, so later calls don't retry it per request.
+_GENAI_IMPORT_FAILED = False
+
+@functools.lru_cache(maxsize=1)
+def _resolve_api_key() -> Optional[str]:
+    """Loads .env once and returns GEMINI_API_KEY; call cache_clear() to re-read."""
+    from dotenv import find_dotenv, load_dotenv
+    # Prefer the .env next to this file so that starting uvicorn from parent/root
+    # still picks up the key; only search upward from the CWD when it is missing.
+    try:
+        env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+        if not os.path.isfile(env_path):
+            env_path = find_dotenv(usecwd=True)
+        if env_path:
+            load_dotenv(dotenv_path=env_path, override=False)
+    except Exception:
+        # Non-fatal: we will still rely on existing env if present
+        pass
+    return os.getenv("GEMINI_API_KEY")
+
+# Resolve at import so the first request doesn't pay for the .env read.
+_resolve_api_key()
 
 def configure_gemini() -> bool:
     """Configures the Gemini API client. Falls back gracefully if unavailable."""
-    global GEMINI_ENABLED
-    # If package import failed, we cannot use Gemini
-    if genai is None:
+    global GEMINI_ENABLED, genai, _GENAI_IMPORT_FAILED
+    api_key = _resolve_api_key()
+    if not api_key:
         GEMINI_ENABLED = False
-        print("⚠️ google.generativeai not available; using local fallback generation")
+        log.warning("GEMINI_API_KEY not set; using local fallback generation")
         return False
-    try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+    # If package import fails, we cannot use Gemini
+    if _GENAI_IMPORT_FAILED:
+        GEMINI_ENABLED = False
+        return False
+    if genai is None:
+        try:
+            import google.generativeai as genai  # type: ignore
+        except Exception:
+            genai = None
+            _GENAI_IMPORT_FAILED = True
             GEMINI_ENABLED = False
-            print("⚠️ GEMINI_API_KEY not set; using local fallback generation")
+            log.warning("google.generativeai not available; using local fallback generation")
             return False
+    try:
         genai.configure(api_key=api_key)
         GEMINI_ENABLED = True
-        print("✅ Gemini API configured successfully")
+        log.info("Gemini API configured successfully")
         return True
     except Exception as e:
         GEMINI_ENABLED = False
-        print(f"⚠️ Failed to configure Gemini API: {str(e)} — using local fallback generation")
+        log.warning("Failed to configure Gemini API: %s — using local fallback generation", e)
         return False
 
+@functools.lru_cache(maxsize=4)
+def _get_model(name: str):
+    """Returns a shared GenerativeModel per model name so its client is reused across reports."""
+    return genai.GenerativeModel(name)
+
+# A model's async client is bound to the event loop it first ran on, so async
+# callers get models cached per loop. Loops are held weakly and entries for
+# loops closed by asyncio.run are dropped on the next lookup.
+_ASYNC_MODELS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def _get_async_model(name: str):
+    """Returns a shared GenerativeModel for name, scoped to the running event loop."""
+    for stale in [loop for loop in _ASYNC_MODELS if loop.is_closed()]:
+        del _ASYNC_MODELS[stale]
+    models = _ASYNC_MODELS.setdefault(asyncio.get_running_loop(), {})
+    if name not in models:
+        models[name] = genai.GenerativeModel(name)
+    return models[name]
+
 # ============================================================
 # ENHANCED HTML TEMPLATE
 # ============================================================
 
-ENHANCED_HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>LUMÉRA AI - Facial Analysis Report</title>
-    <style>
-        * {{
+# Report stylesheet; inlined into standalone reports or written once as
+# REPORT_CSS_FILENAME next to reports that are served over HTTP.
+REPORT_CSS_FILENAME = "report.css"
+
+_CSS_BLOCK = """
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Poppins', 'Inter', 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
             background: linear-gradient(135deg, #181c2f 0%, #23244a 50%, #101a2a 100%);
             color: #e6f6f2;
             min-height: 100vh;
             padding: 40px 20px;
             line-height: 1.6;
-        }}
+        }
         
-        .container {{
+        .container {
             background: linear-gradient(135deg, rgba(35,36,74,0.98) 0%, rgba(160,132,238,0.12) 100%);
             backdrop-filter: blur(32px) saturate(200%);
             border-radius: 24px;
@@ -85,34 +135,34 @@ ENHANCED_HTML_TEMPLATE = """
             max-width: 900px;
             margin: 0 auto;
             animation: fadeIn 0.6s ease-in;
-        }}
+        }
         
-        @keyframes fadeIn {{
-            from {{ opacity: 0; transform: translateY(20px); }}
-            to {{ opacity: 1; transform: translateY(0); }}
-        }}
+        @keyframes fadeIn {
+            from { opacity: 0; transform: translateY(20px); }
+            to { opacity: 1; transform: translateY(0); }
+        }
         
-        @keyframes float {{
-            0%, 100% {{ transform: translateY(0); }}
-            50% {{ transform: translateY(-10px); }}
-        }}
+        @keyframes float {
+            0%, 100% { transform: translateY(0); }
+            50% { transform: translateY(-10px); }
+        }
         
-        header {{
+        header {
             text-align: center;
             margin-bottom: 40px;
             padding-bottom: 30px;
             border-bottom: 3px solid rgba(160,132,238,0.3);
-        }}
+        }
         
-        .logo-container {{
+        .logo-container {
             display: flex;
             align-items: center;
             justify-content: center;
             gap: 15px;
             margin-bottom: 20px;
-        }}
+        }
         
-        .logo {{
+        .logo {
             width: 60px;
             height: 60px;
             background: white;
@@ -120,9 +170,9 @@ ENHANCED_HTML_TEMPLATE = """
             padding: 8px;
             box-shadow: 0 0 20px rgba(160,132,238,0.6);
             animation: float 3s ease-in-out infinite;
-        }}
+        }
         
-        .logo-text {{
+        .logo-text {
             font-size: 2em;
             font-weight: 800;
             background: linear-gradient(90deg, #a084ee 0%, #f472b6 50%, #6ee7b7 100%);
@@ -130,9 +180,9 @@ ENHANCED_HTML_TEMPLATE = """
             -webkit-text-fill-color: transparent;
             background-clip: text;
             letter-spacing: -0.02em;
-        }}
+        }
         
-        header h1 {{
+        header h1 {
             color: #e6f6f2;
             font-size: 2em;
             font-weight: 700;
@@ -141,33 +191,33 @@ ENHANCED_HTML_TEMPLATE = """
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
             background-clip: text;
-        }}
+        }
         
-        .timestamp {{
+        .timestamp {
             font-size: 0.95em;
             color: #b3b8e0;
             font-weight: 500;
-        }}
+        }
         
-        .image-container {{
+        .image-container {
             text-align: center;
             margin: 30px 0;
-        }}
+        }
         
-        .image-container img {{
+        .image-container img {
             border-radius: 16px;
             max-width: 300px;
             height: auto;
             box-shadow: 0 10px 30px rgba(160,132,238,0.4);
             border: 3px solid #a084ee;
             transition: transform 0.3s ease;
-        }}
+        }
         
-        .image-container img:hover {{
+        .image-container img:hover {
             transform: scale(1.05);
-        }}
+        }
         
-        section {{
+        section {
             margin: 30px 0;
             padding: 25px;
             background: rgba(35,36,74,0.6);
@@ -175,15 +225,15 @@ ENHANCED_HTML_TEMPLATE = """
             border-left: 5px solid #a084ee;
             transition: all 0.3s ease;
             box-shadow: 0 4px 12px rgba(0,0,0,0.2);
-        }}
+        }
         
-        section:hover {{
+        section:hover {
             box-shadow: 0 8px 24px rgba(160,132,238,0.3);
             transform: translateX(5px);
             background: rgba(35,36,74,0.8);
-        }}
+        }
         
-        section h2 {{
+        section h2 {
             color: #e6f6f2;
             font-size: 1.5em;
             margin-bottom: 15px;
@@ -191,26 +241,26 @@ ENHANCED_HTML_TEMPLATE = """
             display: flex;
             align-items: center;
             gap: 10px;
-        }}
+        }
         
-        section h2 .emoji {{
+        section h2 .emoji {
             font-size: 1.3em;
-        }}
+        }
         
-        section p {{
+        section p {
             color: #b3b8e0;
             font-size: 1.05em;
             line-height: 1.8;
             margin: 10px 0;
-        }}
+        }
         
-        ul {{
+        ul {
             list-style-type: none;
             padding: 0;
             margin-top: 15px;
-        }}
+        }
         
-        li {{
+        li {
             margin: 12px 0;
             padding: 12px 15px;
             background: rgba(24,28,47,0.6);
@@ -220,55 +270,55 @@ ENHANCED_HTML_TEMPLATE = """
             box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
             transition: all 0.2s ease;
             color: #b3b8e0;
-        }}
+        }
         
-        li:hover {{
+        li:hover {
             box-shadow: 0 4px 12px rgba(160,132,238,0.2);
             transform: translateX(3px);
             background: rgba(35,36,74,0.8);
-        }}
+        }
         
-        li.good-feature::before {{
+        li.good-feature::before {
             content: "✨";
             position: absolute;
             left: 12px;
             top: 12px;
             font-size: 1.2em;
-        }}
+        }
         
-        li.bad-feature::before {{
+        li.bad-feature::before {
             content: "⚠️";
             position: absolute;
             left: 12px;
             top: 12px;
             font-size: 1.2em;
-        }}
+        }
         
-        li.neutral-feature::before {{
+        li.neutral-feature::before {
             content: "ℹ️";
             position: absolute;
             left: 12px;
             top: 12px;
             font-size: 1.2em;
-        }}
+        }
         
-        .section-skincare {{
+        .section-skincare {
             border-left-color: #6ee7b7;
-        }}
+        }
         
-        .section-grooming {{
+        .section-grooming {
             border-left-color: #f472b6;
-        }}
+        }
         
-        .section-attractiveness {{
+        .section-attractiveness {
             border-left-color: #7f5af0;
-        }}
+        }
         
-        .section-features {{
+        .section-features {
             border-left-color: #6f6ee8;
-        }}
+        }
         
-        footer {{
+        footer {
             margin-top: 50px;
             padding-top: 30px;
             border-top: 3px solid rgba(160,132,238,0.3);
@@ -276,62 +326,75 @@ ENHANCED_HTML_TEMPLATE = """
             color: #b3b8e0;
             font-size: 0.95em;
             font-weight: 500;
-        }}
+        }
         
-        .footer-brand {{
+        .footer-brand {
             font-weight: 700;
             background: linear-gradient(90deg, #a084ee 0%, #f472b6 50%, #6ee7b7 100%);
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
             background-clip: text;
-        }}
+        }
         
-        @media (max-width: 768px) {{
-            body {{
+        @media (max-width: 768px) {
+            body {
                 padding: 20px 10px;
-            }}
+            }
             
-            .container {{
+            .container {
                 padding: 25px;
-            }}
+            }
             
-            header h1 {{
+            header h1 {
                 font-size: 1.8em;
-            }}
+            }
             
-            .logo {{
+            .logo {
                 width: 50px;
                 height: 50px;
-            }}
+            }
             
-            .logo-text {{
+            .logo-text {
                 font-size: 1.5em;
-            }}
+            }
             
-            section {{
+            section {
                 padding: 20px;
-            }}
+            }
             
-            section h2 {{
+            section h2 {
                 font-size: 1.3em;
-            }}
-        }}
+            }
+        }
         
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
-            }}
+            }
             
-            .container {{
+            .container {
                 box-shadow: none;
                 border: 2px solid #a084ee;
-            }}
+            }
             
-            section {{
+            section {
                 break-inside: avoid;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+ENHANCED_HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>LUMÉRA AI - Facial Analysis Report</title>
+    {% if stylesheet_href %}
+    <link rel="stylesheet" href="{{ stylesheet_href }}">
+    {% else %}
+    <style>{CSS_BLOCK}</style>
+    {% endif %}
 </head>
 <body>
     <div class="container">
@@ -341,43 +404,43 @@ ENHANCED_HTML_TEMPLATE = """
                 <div class="logo-text">LUMÉRA AI</div>
             </div>
             <h1>Facial Analysis Report</h1>
-            <div class="timestamp">Generated: {timestamp}</div>
+            <div class="timestamp">Generated: {{ timestamp }}</div>
         </header>
         
         <div class="image-container">
-            <img src="{image_path}" alt="Subject Image">
+            <img src="{{ image_path }}" alt="Subject Image">
         </div>
 
         <section class="section-summary">
             <h2><span class="emoji">�</span> Executive Summary</h2>
-            <p>{summary_text}</p>
+            <p>{{ summary_text }}</p>
         </section>
 
         <section class="section-skincare">
             <h2><span class="emoji">🧴</span> Skincare Insights</h2>
-            <ul>{skincare_list}</ul>
+            <ul>{{ skincare_list|safe }}</ul>
         </section>
 
         <section class="section-grooming">
             <h2><span class="emoji">�</span> Grooming & Hair Insights</h2>
-            <ul>{grooming_list}</ul>
+            <ul>{{ grooming_list|safe }}</ul>
         </section>
 
         <section class="section-attractiveness">
             <h2><span class="emoji">⭐</span> Attractiveness Analysis</h2>
-            <p>{attractiveness_comment}</p>
+            <p>{{ attractiveness_comment }}</p>
         </section>
 
         <section class="section-features">
             <h2><span class="emoji">�</span> Feature Analysis</h2>
             <h3 style="color: #6ee7b7; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">👍 Standout Features</h3>
-            <ul>{good_features_list}</ul>
+            <ul>{{ good_features_list|safe }}</ul>
             
             <h3 style="color: #f472b6; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">⚠️ Areas for Enhancement</h3>
-            <ul>{bad_features_list}</ul>
+            <ul>{{ bad_features_list|safe }}</ul>
             
             <h3 style="color: #b3b8e0; margin-top: 20px; margin-bottom: 10px; font-size: 1.2em;">ℹ️ Additional Observations</h3>
-            <ul>{neutral_features_list}</ul>
+            <ul>{{ neutral_features_list|safe }}</ul>
         </section>
         
         <footer>
@@ -389,6 +452,16 @@ ENHANCED_HTML_TEMPLATE = """
 </html>
 """
 
+# Compiled once at import; rendering reuses the same template object per request.
+# The stylesheet is spliced into the source first (as a raw block) so Jinja
+# merges it with the surrounding static markup into constant output chunks.
+_TEMPLATE_ENV = jinja2.Environment(
+    autoescape=True, auto_reload=False, cache_size=-1, trim_blocks=True, lstrip_blocks=True
+)
+_REPORT_TEMPLATE = _TEMPLATE_ENV.from_string(
+    ENHANCED_HTML_TEMPLATE.replace("{CSS_BLOCK}", "{% raw %}" + _CSS_BLOCK + "{% endraw %}")
+)
+
 # ============================================================
 # IMPROVED PROMPT TEMPLATES
 # ============================================================
@@ -509,45 +582,87 @@ FEATURE DESCRIPTIONS:
 Generate the JSON response now:
 """
 
+def _split_prompt(template: str, *fields: str) -> Tuple[str, ...]:
+    """Splits a format-style prompt around its placeholders into literal segments.
+
+    Escaped braces are collapsed the way str.format would, so joining the
+    segments with the field values reproduces template.format(...).
+    """
+    segments = []
+    rest = template
+    for field in fields:
+        head, rest = rest.split("{" + field + "}", 1)
+        segments.append(head)
+    segments.append(rest)
+    return tuple(s.replace("{{", "{").replace("}}", "}") for s in segments)
+
+# Each prompt has fixed placeholders, so the static text is prepared once and
+# requests only concatenate the serialized data in between.
+_SUMMARY_PROMPT_PARTS = _split_prompt(GEMINI_SUMMARY_PROMPT, "data_str")
+_CONTENT_PROMPT_PARTS = _split_prompt(GEMINI_CONTENT_PROMPT, "json_data", "feature_descriptions")
+
 # ============================================================
 # UTILITY FUNCTIONS
 # ============================================================
 
+def _dumps(obj: Any) -> str:
+    """Pretty-prints obj as JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            # orjson rejects some inputs json accepts (non-str keys, float
+            # subclasses such as numpy.float64); keep accepting them.
+            pass
+    return json.dumps(obj, indent=2)
+
 def load_json_file(json_path: str) -> Dict[str, Any]:
     """Loads a JSON file with comprehensive error handling."""
     if not os.path.exists(json_path):
         raise FileNotFoundError(f"JSON file not found: {json_path}")
     
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"✅ Successfully loaded JSON from: {json_path}")
-            return data
+        if orjson is not None:
+            # Decode straight from the mapped file instead of copying it into a bytes object
+            with open(json_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    data = orjson.loads(view)
+        else:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        log.info("Loaded JSON from: %s", json_path)
+        return data
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON format in {json_path}: {str(e)}")
     except Exception as e:
         raise ValueError(f"Error loading JSON file {json_path}: {str(e)}")
 
+# Anchored ```/```json opening fence; the closing fence is removed separately
+# since it may still be missing while a reply is streaming.
+_OPEN_FENCE_RE = re.compile(r"\s*```(?:json)?")
+
 def clean_json_response(response_text: str) -> str:
     """Cleans Gemini response to extract valid JSON."""
     # Remove markdown code blocks if present
-    response_text = response_text.strip()
-    
-    if response_text.startswith("```json"):
-        response_text = response_text[7:]
-    elif response_text.startswith("```"):
-        response_text = response_text[3:]
-    
-    if response_text.endswith("```"):
-        response_text = response_text[:-3]
-    
-    return response_text.strip()
+    m = _OPEN_FENCE_RE.match(response_text)
+    if m:
+        response_text = response_text[m.end():]
+    return response_text.rstrip().removesuffix("```").strip()
+
+def _predicted_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps each attribute to its raw prediction, unwrapping {"predicted": ...} entries."""
+    return {k: v.get("predicted") if isinstance(v, dict) else v for k, v in data.items()}
+
+def _truthy_keys(data: Dict[str, Any]) -> frozenset:
+    """Returns the set of attributes whose prediction is truthy."""
+    return frozenset(k for k, v in _predicted_values(data).items() if v)
 
 def _local_summary(data: Dict[str, Any]) -> str:
     # Construct a lightweight, human-friendly summary from available fields
     try:
         attrs = []
-        getp = lambda k: data.get(k, {}).get("predicted") if isinstance(data.get(k), dict) else data.get(k)
+        predicted = _predicted_values(data)
+        getp = predicted.get
         if getp("male") is True:
             attrs.append("male")
         elif getp("male") is False:
@@ -576,49 +691,98 @@ def _local_summary(data: Dict[str, Any]) -> str:
     except Exception:
         return "Your facial attributes have been analyzed and summarized."
 
+# Gemini responses keyed by a digest of the exact prompt, so re-rendering the
+# same predictions (retries, preview vs. final) skips the network round trip.
+_RESPONSE_CACHE_SIZE = 128
+_RESPONSE_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+def _cache_get(key: str) -> Optional[Any]:
+    if key not in _RESPONSE_CACHE:
+        return None
+    _RESPONSE_CACHE.move_to_end(key)
+    return copy.deepcopy(_RESPONSE_CACHE[key])
+
+def _cache_put(key: str, value: Any) -> None:
+    _RESPONSE_CACHE[key] = copy.deepcopy(value)
+    _RESPONSE_CACHE.move_to_end(key)
+    if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_SIZE:
+        _RESPONSE_CACHE.popitem(last=False)
+
+def _cache_lookup(kind: str, prompt: str) -> Tuple[str, Optional[Any]]:
+    """Returns (cache key, cached response or None) for a prompt."""
+    key = _prompt_key(prompt)
+    cached = _cache_get(key)
+    if cached is not None:
+        log.info("Reusing cached %s", kind)
+    return key, cached
+
+def _summary_prompt(data: Dict[str, Any]) -> str:
+    pre, post = _SUMMARY_PROMPT_PARTS
+    return pre + _dumps(data) + post
+
+def _store_summary(key: str, response_text: str) -> str:
+    summary = response_text.strip()
+    log.info("Generated summary (%d characters)", len(summary))
+    _cache_put(key, summary)
+    return summary
+
 def generate_summary(data: Dict[str, Any]) -> str:
     """Generates a short summary; uses Gemini if available, else local fallback."""
     if GEMINI_ENABLED and genai is not None:
         try:
-            data_str = json.dumps(data, indent=2)
-            prompt = GEMINI_SUMMARY_PROMPT.format(data_str=data_str)
-            model = genai.GenerativeModel(GEMINI_MODEL)
+            prompt = _summary_prompt(data)
+            key, cached = _cache_lookup("summary", prompt)
+            if cached is not None:
+                return cached
+            model = _get_model(GEMINI_MODEL)
             response = model.generate_content(prompt)
-            summary = response.text.strip()
-            print(f"✅ Generated summary ({len(summary)} characters)")
-            return summary
+            return _store_summary(key, response.text)
+        except Exception as e:
+            log.warning("Gemini summary failed: %s; using local fallback", e)
+    return _local_summary(data)
+
+async def generate_summary_async(data: Dict[str, Any]) -> str:
+    """Async variant of generate_summary using Gemini's non-blocking client."""
+    if GEMINI_ENABLED and genai is not None:
+        try:
+            prompt = _summary_prompt(data)
+            key, cached = _cache_lookup("summary", prompt)
+            if cached is not None:
+                return cached
+            model = _get_async_model(GEMINI_MODEL)
+            response = await model.generate_content_async(prompt)
+            return _store_summary(key, response.text)
         except Exception as e:
-            print(f"⚠️ Warning: Gemini summary failed: {str(e)}; using local fallback")
+            log.warning("Gemini summary failed: %s; using local fallback", e)
     return _local_summary(data)
 
 def _local_content(data: Dict[str, Any]) -> Dict[str, Any]:
-    def pred(k):
-        v = data.get(k)
-        if isinstance(v, dict):
-            return bool(v.get("predicted"))
-        return bool(v)
+    truthy = _truthy_keys(data)
     skincare = []
     grooming = []
     positives = []
     improve = []
     other = []
-    if pred("oily_skin"):
+    if "oily_skin" in truthy:
         skincare.append("Use an oil-free cleanser and non-comedogenic moisturizer.")
-    if pred("dark_circles"):
+    if "dark_circles" in truthy:
         skincare.append("Consider eye cream with caffeine and ensure proper sleep.")
-    if pred("curly_hair"):
+    if "curly_hair" in truthy:
         grooming.append("Use sulfate-free shampoo and a curl-defining leave-in.")
-    if pred("has_beard"):
+    if "has_beard" in truthy:
         grooming.append("Apply beard oil and maintain regular trims for shape.")
-    if pred("sharp_jawline"):
+    if "sharp_jawline" in truthy:
         positives.append("Well-defined jawline enhances facial structure.")
-    if pred("big_eyes"):
+    if "big_eyes" in truthy:
         positives.append("Expressive eyes draw positive attention.")
-    if pred("attractive"):
+    if "attractive" in truthy:
         positives.append("Overall attractive facial balance.")
-    if pred("patchy_beard"):
+    if "patchy_beard" in truthy:
         improve.append("Even growth can improve with regular grooming and patience.")
-    if pred("receeding_hairline"):
+    if "receeding_hairline" in truthy:
         improve.append("Consult a specialist and consider volumizing hairstyles.")
     other.append("Recommendations are informational and not medical advice.")
     return {
@@ -630,61 +794,159 @@ def _local_content(data: Dict[str, Any]) -> Dict[str, Any]:
         "other_observations_list": other[:3]
     }
 
+def _content_prompt(data: Dict[str, Any], feature_descriptions: Dict[str, Any]) -> str:
+    pre, mid, post = _CONTENT_PROMPT_PARTS
+    return (
+        pre + _dumps(data)
+        + mid + _dumps(feature_descriptions)
+        + post
+    )
+
+def _try_parse_partial(buffer: str) -> Optional[Dict[str, Any]]:
+    """Returns the parsed object once a streamed reply forms complete JSON, else None."""
+    cleaned = clean_json_response(buffer)
+    if not cleaned.endswith("}"):
+        return None
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return None
+
+def _parse_content_response(raw_response: str, content: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Parses Gemini's JSON reply and fills in any missing section keys.
+
+    content may carry an object already decoded while the reply was streaming.
+    """
+    log.debug("Raw Gemini response received")
+    if content is None:
+        content = json.loads(clean_json_response(raw_response))
+    required_keys = [
+        "skincare_list", "grooming_list", "attractiveness_comment",
+        "positive_features_list", "features_to_improve_list", "other_observations_list"
+    ]
+    for key in required_keys:
+        if key not in content:
+            if key.endswith("_list"):
+                content[key] = []
+            else:
+                content[key] = ""
+    log.info("Content validation successful")
+    return content
+
+class _ContentStream:
+    """Accumulates streamed reply text until it forms a complete JSON object."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.parsed: Optional[Dict[str, Any]] = None
+
+    def feed(self, text: str) -> bool:
+        """Adds a chunk; returns True once the reply can be parsed and reading may stop."""
+        self.buffer += text
+        self.parsed = _try_parse_partial(self.buffer)
+        return self.parsed is not None
+
+    def finish(self) -> Dict[str, Any]:
+        return _parse_content_response(self.buffer.strip(), self.parsed)
+
 def generate_content(data: Dict[str, Any], feature_descriptions: Dict[str, Any]) -> Dict[str, Any]:
     """Generates content; uses Gemini if available, else a local rules-based fallback."""
     if GEMINI_ENABLED and genai is not None:
         try:
-            prompt = GEMINI_CONTENT_PROMPT.format(
-                json_data=json.dumps(data, indent=2),
-                feature_descriptions=json.dumps(feature_descriptions, indent=2)
-            )
-            model = genai.GenerativeModel(GEMINI_MODEL)
-            response = model.generate_content(prompt)
-            raw_response = response.text.strip()
-            print("📝 Raw Gemini response received")
-            cleaned_response = clean_json_response(raw_response)
-            content = json.loads(cleaned_response)
-            required_keys = [
-                "skincare_list", "grooming_list", "attractiveness_comment",
-                "positive_features_list", "features_to_improve_list", "other_observations_list"
-            ]
-            for key in required_keys:
-                if key not in content:
-                    if key.endswith("_list"):
-                        content[key] = []
-                    else:
-                        content[key] = ""
-            print("✅ Content validation successful")
+            prompt = _content_prompt(data, feature_descriptions)
+            key, cached = _cache_lookup("content", prompt)
+            if cached is not None:
+                return cached
+            model = _get_model(GEMINI_MODEL)
+            # Stream the reply and stop reading as soon as the JSON object is complete
+            stream = _ContentStream()
+            for chunk in model.generate_content(prompt, stream=True):
+                if stream.feed(chunk.text):
+                    break
+            content = stream.finish()
+            _cache_put(key, content)
             return content
         except Exception as e:
-            print(f"⚠️ Warning: Gemini content failed: {str(e)}; using local fallback")
+            log.warning("Gemini content failed: %s; using local fallback", e)
     return _local_content(data)
 
+async def generate_content_async(data: Dict[str, Any], feature_descriptions: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of generate_content using Gemini's non-blocking client."""
+    if GEMINI_ENABLED and genai is not None:
+        try:
+            prompt = _content_prompt(data, feature_descriptions)
+            key, cached = _cache_lookup("content", prompt)
+            if cached is not None:
+                return cached
+            model = _get_async_model(GEMINI_MODEL)
+            # Stream the reply and stop reading as soon as the JSON object is complete
+            stream = _ContentStream()
+            async for chunk in await model.generate_content_async(prompt, stream=True):
+                if stream.feed(chunk.text):
+                    break
+            content = stream.finish()
+            _cache_put(key, content)
+            return content
+        except Exception as e:
+            log.warning("Gemini content failed: %s; using local fallback", e)
+    return _local_content(data)
+
+# Single-pass escaping for model output placed inside pre-rendered <li> markup.
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
 def format_list_items(items: List[str]) -> str:
     """Formats a list of items into HTML <li> tags with validation."""
-    if not items or len(items) == 0:
+    # Clean each item once; blank entries are dropped
+    cleaned_items = (str(item).strip().translate(_HTML_ESCAPE_TABLE) for item in items or ())
+    if not (formatted := "\n".join(f"<li>{item}</li>" for item in cleaned_items if item)):
         return "<li>No specific recommendations at this time</li>"
-    
-    formatted_items = []
-    for item in items:
-        # Clean and validate each item
-        cleaned_item = str(item).strip()
-        if cleaned_item:
-            formatted_items.append(f"<li>{cleaned_item}</li>")
-    
-    return "\n".join(formatted_items) if formatted_items else "<li>No specific recommendations at this time</li>"
+    return formatted
+
+# (day, "Month DD, YYYY, ") so only the time part is formatted per report.
+_DATE_PREFIX_CACHE: Tuple[Optional[date], str] = (None, "")
 
 def get_formatted_timestamp() -> str:
     """Returns current timestamp in a nice format."""
-    return datetime.now().strftime("%B %d, %Y, %I:%M %p IST")
+    global _DATE_PREFIX_CACHE
+    now = datetime.now()
+    today = now.date()
+    cached_day, prefix = _DATE_PREFIX_CACHE
+    if cached_day != today:
+        prefix = now.strftime("%B %d, %Y, ")
+        _DATE_PREFIX_CACHE = (today, prefix)
+    return prefix + now.strftime("%I:%M %p") + " IST"
+
+def open_report_file(output_html: str) -> IO[str]:
+    """Opens a report for writing; paths ending in .gz get a gzip-compressed file."""
+    if output_html.endswith(".gz"):
+        return gzip.open(output_html, 'wt', encoding='utf-8', compresslevel=6)
+    return open(output_html, 'w', encoding='utf-8')
+
+def write_report_stylesheet(directory: str) -> str:
+    """Writes the shared report stylesheet into directory (once) and returns its path."""
+    css_path = os.path.join(directory, REPORT_CSS_FILENAME)
+    try:
+        with open(css_path, 'r', encoding='utf-8') as f:
+            if f.read() == _CSS_BLOCK:
+                return css_path
+    except OSError:
+        pass
+    with open(css_path, 'w', encoding='utf-8') as f:
+        f.write(_CSS_BLOCK)
+    return css_path
 
 def generate_html_report(
     data: Dict[str, Any],
     summary: str,
     content: Dict[str, Any],
-    image_path: str
+    image_path: str,
+    stylesheet_href: Optional[str] = None
 ) -> str:
-    """Generates HTML report by injecting text into the enhanced template."""
+    """Generates HTML report by injecting text into the enhanced template.
+
+    The stylesheet is inlined unless stylesheet_href points at a copy written
+    by write_report_stylesheet().
+    """
     try:
         # Extract attractiveness data safely
         attractive_prob = data.get("attractive", {}).get("probability", 0)
@@ -696,7 +958,8 @@ def generate_html_report(
         timestamp = get_formatted_timestamp()
         
         # Generate HTML
-        html_report = ENHANCED_HTML_TEMPLATE.format(
+        html_report = _REPORT_TEMPLATE.render(
+            stylesheet_href=stylesheet_href,
             timestamp=timestamp,
             image_path=image_path,
             summary_text=summary,
@@ -710,7 +973,7 @@ def generate_html_report(
             neutral_features_list=format_list_items(content.get("other_observations_list", []))
         )
         
-        print("✅ HTML report generated successfully")
+        log.info("HTML report generated successfully")
         return html_report
         
     except Exception as e:
@@ -720,76 +983,149 @@ def generate_html_report(
 # MAIN EXECUTION FUNCTION
 # ============================================================
 
-def main(json_path: str, feature_json_path: str, image_path: str, output_html: str) -> None:
+async def main_async(json_path: str, feature_json_path: str, image_path: str, output_html: str) -> None:
     """Main process to generate full HTML facial analysis report with comprehensive error handling."""
-    print("\n" + "="*60)
-    print("FACIAL ANALYSIS REPORT GENERATOR")
-    print("="*60 + "\n")
+    log.info("FACIAL ANALYSIS REPORT GENERATOR")
     
     try:
         # Step 1: Configure Gemini
-        print("Step 1: Configuring Gemini API...")
+        log.info("Step 1: Configuring Gemini API...")
         configure_gemini()
         
         # Step 2: Load JSON files
-        print("\nStep 2: Loading data files...")
+        log.info("Step 2: Loading data files...")
         data = load_json_file(json_path)
         feature_descriptions = load_json_file(feature_json_path)
         
         # Step 3: Validate image path
-        print("\nStep 3: Validating image path...")
+        log.info("Step 3: Validating image path...")
         if not os.path.exists(image_path):
-            print(f"⚠️ Warning: Image file not found at {image_path}")
-            print("   HTML will be generated but image won't display")
+            log.warning("Image file not found at %s; HTML will be generated but image won't display", image_path)
         else:
-            print(f"✅ Image found: {image_path}")
-        
-        # Step 4: Generate summary
-        print("\nStep 4: Generating executive summary...")
-        summary = generate_summary(data)
+            log.info("Image found: %s", image_path)
         
-        # Step 5: Generate content
-        print("\nStep 5: Generating detailed content sections...")
-        content = generate_content(data, feature_descriptions)
+        # Step 4-5: Generate summary and content sections concurrently
+        log.info("Step 4-5: Generating executive summary and detailed content sections...")
+        summary, content = await asyncio.gather(
+            generate_summary_async(data),
+            generate_content_async(data, feature_descriptions)
+        )
         
         # Step 6: Generate HTML
-        print("\nStep 6: Compiling HTML report...")
+        log.info("Step 6: Compiling HTML report...")
         html_report = generate_html_report(data, summary, content, image_path)
         
         # Step 7: Save file
-        print("\nStep 7: Saving HTML file...")
-        with open(output_html, 'w', encoding='utf-8') as f:
+        log.info("Step 7: Saving HTML file...")
+        with open_report_file(output_html) as f:
             f.write(html_report)
         
-        print("\n" + "="*60)
-        print("✅ SUCCESS!")
-        print("="*60)
-        print(f"\n📄 HTML report saved at:\n   {os.path.abspath(output_html)}")
-        print(f"\n📊 Report Statistics:")
-        print(f"   - Summary length: {len(summary)} characters")
-        print(f"   - Skincare insights: {len(content.get('skincare_list', []))} items")
-        print(f"   - Grooming tips: {len(content.get('grooming_list', []))} items")
-        print(f"   - Positive features: {len(content.get('positive_features_list', []))} items")
-        print("\n" + "="*60 + "\n")
+        log.info("SUCCESS! HTML report saved at: %s", os.path.abspath(output_html))
+        log.info(
+            "Report statistics: summary %d characters, %d skincare insights, "
+            "%d grooming tips, %d positive features",
+            len(summary),
+            len(content.get('skincare_list', [])),
+            len(content.get('grooming_list', [])),
+            len(content.get('positive_features_list', []))
+        )
         
     except FileNotFoundError as e:
-        print(f"\n❌ FILE ERROR: {str(e)}")
-        print("   Please check that all file paths are correct.")
+        log.error("FILE ERROR: %s. Please check that all file paths are correct.", e)
     except ValueError as e:
-        print(f"\n❌ DATA ERROR: {str(e)}")
-        print("   Please check that your JSON files are properly formatted.")
+        log.error("DATA ERROR: %s. Please check that your JSON files are properly formatted.", e)
     except RuntimeError as e:
-        print(f"\n❌ PROCESSING ERROR: {str(e)}")
-        print("   There was an error generating the report.")
+        log.error("PROCESSING ERROR: %s. There was an error generating the report.", e)
     except Exception as e:
-        print(f"\n❌ UNEXPECTED ERROR: {str(e)}")
-        print("   An unexpected error occurred during processing.")
+        log.error("UNEXPECTED ERROR: %s. An unexpected error occurred during processing.", e)
+
+def main(json_path: str, feature_json_path: str, image_path: str, output_html: str) -> None:
+    """Synchronous entry point; runs main_async on a fresh event loop."""
+    asyncio.run(main_async(json_path, feature_json_path, image_path, output_html))
+
+# Upper bound on Gemini requests in flight during main_batch, to stay under
+# the per-minute rate limits that would otherwise push reports to the fallback.
+BATCH_MAX_CONCURRENCY = 4
+
+async def main_batch_async(
+    inputs: List[Tuple[str, str, str, str]],
+    max_concurrency: int = BATCH_MAX_CONCURRENCY
+) -> List[Optional[str]]:
+    """Generates many reports at once, issuing Gemini requests concurrently.
+
+    Each input is a (json_path, feature_json_path, image_path, output_html) tuple.
+    At most max_concurrency Gemini requests run at a time.
+    Returns the written output path per input, or None where that input failed.
+    """
+    configure_gemini()
+
+    # Load every input up front; feature description files are usually shared.
+    descriptions_cache: Dict[str, Dict[str, Any]] = {}
+    loaded = []
+    for json_path, feature_json_path, image_path, output_html in inputs:
+        try:
+            data = load_json_file(json_path)
+            if feature_json_path not in descriptions_cache:
+                descriptions_cache[feature_json_path] = load_json_file(feature_json_path)
+            loaded.append((data, descriptions_cache[feature_json_path], image_path, output_html))
+        except (FileNotFoundError, ValueError) as e:
+            log.error("Skipping %s: %s", json_path, e)
+            loaded.append(None)
+            continue
+        if not os.path.exists(image_path):
+            log.warning("Image file not found at %s; HTML will be generated but image won't display", image_path)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    pending = [item for item in loaded if item is not None]
+    requests = []
+    for data, feature_descriptions, _, _ in pending:
+        requests.append(limited(generate_summary_async(data)))
+        requests.append(limited(generate_content_async(data, feature_descriptions)))
+    results = await asyncio.gather(*requests)
+
+    outputs: List[Optional[str]] = []
+    result_iter = iter(results)
+    for item in loaded:
+        if item is None:
+            outputs.append(None)
+            continue
+        data, _, image_path, output_html = item
+        summary, content = next(result_iter), next(result_iter)
+        try:
+            html_report = generate_html_report(data, summary, content, image_path)
+            with open_report_file(output_html) as f:
+                f.write(html_report)
+            outputs.append(output_html)
+        except (RuntimeError, OSError) as e:
+            log.error("Failed to write %s: %s", output_html, e)
+            outputs.append(None)
+
+    log.info("Batch complete: %d/%d reports written", sum(1 for o in outputs if o), len(inputs))
+    return outputs
+
+def main_batch(
+    inputs: List[Tuple[str, str, str, str]],
+    max_concurrency: int = BATCH_MAX_CONCURRENCY
+) -> List[Optional[str]]:
+    """Synchronous entry point for main_batch_async."""
+    return asyncio.run(main_batch_async(inputs, max_concurrency))
 
 # ============================================================
 # RUN
 # ============================================================
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate an HTML facial analysis report.")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings and errors")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(levelname)s: %(message)s")
+
     # File paths - UPDATE THESE TO MATCH YOUR SYSTEM
     json_path = "./example_predictions.json" # model output
     feature_json_path = "./attribute_mapping.json" # attribute_mapping
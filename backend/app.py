@@ -4,6 +4,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Body
 from fastapi import Request
+import asyncio
 import io
 import os
 import datetime
@@ -21,10 +22,12 @@ if not ensure_model_loader_exists():
 from model_loader import predict_attributes_from_bytes, load_model
 from Gemini import (
     configure_gemini,
-    generate_summary as gemini_generate_summary,
-    generate_content as gemini_generate_content,
+    generate_summary_async as gemini_generate_summary_async,
+    generate_content_async as gemini_generate_content_async,
     generate_html_report as gemini_generate_html_report,
     load_json_file as gemini_load_json_file,
+    write_report_stylesheet as gemini_write_report_stylesheet,
+    REPORT_CSS_FILENAME,
 )
 from temp import crop_face
 import base64
@@ -43,6 +46,8 @@ REPORTS_DIR = os.path.join(STATIC_DIR, "reports")
 os.makedirs(USER_IMAGES_DIR, exist_ok=True)
 os.makedirs(ACCEPTED_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
+# Reports link to one shared stylesheet instead of inlining it each time
+gemini_write_report_stylesheet(REPORTS_DIR)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 # Load the model when the app starts
@@ -129,8 +134,10 @@ async def predict(request: Request, file: UploadFile = File(...)):
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to load attribute mapping: {str(e)}")
 
-        summary_text = gemini_generate_summary(prediction)
-        content_sections = gemini_generate_content(prediction, feature_descriptions)
+        summary_text, content_sections = await asyncio.gather(
+            gemini_generate_summary_async(prediction),
+            gemini_generate_content_async(prediction, feature_descriptions),
+        )
 
         # Step 3: Generate HTML report and save under static/reports
         report_filename = f"report_{name_root}_{timestamp}.html"
@@ -144,6 +151,7 @@ async def predict(request: Request, file: UploadFile = File(...)):
                 summary=summary_text,
                 content=content_sections,
                 image_path=absolute_image_url,
+                stylesheet_href=REPORT_CSS_FILENAME,
             )
             with open(report_path, "w", encoding="utf-8") as rf:
                 rf.write(html)